@@ -1,10 +1,22 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
-from .app import app
+from typing import Any
+
 from .main import run
 
 __all__ = [
     "run",
     "app",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    # the app is imported on first access, so the task runs don't import the server dependencies
+    if name == "app":
+        from .app import app
+
+        # importing the submodule binds it to the package attribute, override it with the app itself
+        globals()["app"] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
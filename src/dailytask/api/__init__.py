@@ -1,22 +1,31 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
-from dailytask.common import config
+from collections.abc import Callable
+from typing import Any
+
+from dailytask.common import config, utils
 
 from ._redsea import RedSea
 from ._yunyu import YunYu
 
-yunyu = YunYu(config.YUNYU_BASE_URL, config.YUNYU_ACCOUNT, config.YUNYU_PASSWORD)
-redsea = RedSea(
-    config.REDSEA_BASE_URL,
-    config.REDSEA_USER_AGENT,
-    config.REDSEA_APP_SECRET,
-    config.REDSEA_LOGIN_ID,
-    config.REDSEA_AGENT_ID,
-    config.REDSEA_LAZY_LONGITUDE,
-    config.REDSEA_LAZY_LATITUDE,
-    config.REDSEA_LAZY_ADDRESS,
-)
+# the clients are built on first access, so a run only needs the settings of the clients it uses
+yunyu: YunYu
+redsea: RedSea
+_CLIENTS: dict[str, Callable[[str], Any]] = {
+    "yunyu": lambda _: YunYu(config.YUNYU_BASE_URL, config.YUNYU_ACCOUNT, config.YUNYU_PASSWORD),
+    "redsea": lambda _: RedSea(
+        config.REDSEA_BASE_URL,
+        config.REDSEA_USER_AGENT,
+        config.REDSEA_APP_SECRET,
+        config.REDSEA_LOGIN_ID,
+        config.REDSEA_AGENT_ID,
+        config.REDSEA_LAZY_LONGITUDE,
+        config.REDSEA_LAZY_LATITUDE,
+        config.REDSEA_LAZY_ADDRESS,
+    ),
+}
+__getattr__ = utils.lazy_module_getattr(globals(), _CLIENTS)
 
 __all__ = [
     "yunyu",
@@ -1,22 +1,26 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
-import json
+import hashlib
+import logging
 import random
 from datetime import datetime
 from typing import Any, TypedDict
 from urllib.parse import urlparse
 
 import httpx
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
+import orjson
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential, wait_random
 
-from ..common import config, utils
+from ..common import config, http, utils
 
 log = utils.get_logger(
     name="api-redsea",
     log_level=config.LOG_LEVEL,
     log_file_path=f"{config.LOG_DIR}/redsea.log",
 )
+# marks the requests (and their redirects) of the login flow, which must skip the interceptors
+LOGIN_EXTENSIONS = {"redsea_login": True}
 
 
 class UnauthorizedError(RuntimeError):
@@ -42,6 +46,10 @@ class RedSea:
     hostname: str
     user: User
     session: httpx.AsyncClient
+    _rng: random.Random
+    _punch_card_headers: dict[str, str]
+    _daka_data: dict[str, str]
+    _sign_prefix_md5: Any
 
     def __init__(
         self,
@@ -62,7 +70,12 @@ class RedSea:
         self.latitude = latitude
         self.address = address
         self.hostname = urlparse(base_url).hostname
-        self.session = httpx.AsyncClient(base_url=base_url, timeout=httpx.Timeout(24))
+        self.session = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=http.DEFAULT_TIMEOUT,
+            limits=http.DEFAULT_LIMITS,
+            http2=True,
+        )
         self.session.event_hooks.update(
             {
                 "request": [self._request_interceptor],
@@ -76,158 +89,178 @@ class RedSea:
                 "Origin": f"https://{self.hostname}",
             }
         )
+        # private generator seeded from os.urandom, independent of the shared module-level one
+        self._rng = random.Random()
+        # the static parts of the punch card requests
+        self._punch_card_headers = {
+            "Referer": f"https://{self.hostname}/RedseaPlatform/jsp/kqUni/punchCard/punchCard.jsp?agentId"
+            f"={self.agent_id}=&isQywx=1",
+        }
+        self._daka_data = {
+            "address": self.address,
+            "agentId": self.agent_id,
+            "imei": "",
+            "ssid": "",
+            "faceUrl": "",
+            "isLeave": "false",
+            "clientType": "1",
+            "mockGpsProbability": "",
+        }
+        # the sign is md5 of "app_secret&login_id&timestamp", only the timestamp varies between calls
+        self._sign_prefix_md5 = hashlib.md5(f"{app_secret}&{login_id}&".encode(), usedforsecurity=False)
 
     async def _request_interceptor(self, request: httpx.Request) -> None:
-        if not hasattr(self, "user"):
-            self._init()
+        if not hasattr(self, "user") and not request.extensions.get("redsea_login"):
+            await self._init()
             raise UnauthorizedError
 
-        await request.aread()
-        log.info(
-            "request interceptor: %s %s, payload: %s, headers: %s",
-            request.method,
-            request.url,
-            request.content.decode(),
-            request.headers,
-        )
+        if log.isEnabledFor(logging.INFO):
+            await request.aread()
+            log.info(
+                "request interceptor: %s %s, payload: %s, headers: %s",
+                request.method,
+                request.url,
+                request.content.decode(),
+                request.headers,
+            )
 
     async def _response_interceptor(self, response: httpx.Response) -> None:
+        request = response.request
+        is_login_request = request.extensions.get("redsea_login")
         # redirect, unauthorized
-        if response.status_code == httpx.codes.FOUND and response.headers.get("Location") == "/RedseaPlatform/index":
-            self._login()
+        if (
+            not is_login_request
+            and response.status_code == httpx.codes.FOUND
+            and response.headers.get("Location") == "/RedseaPlatform/index"
+        ):
+            await self._login()
             raise UnauthorizedError
 
         # read the response
         await response.aread()
-        request = response.request
-        log.info(
-            "response interceptor: %s %s %s %s payload: %s, headers: %s, result: %s",
-            request.method,
-            request.url,
-            response.http_version,
-            response.status_code,
-            request.content.decode(),
-            response.headers,
-            response.text[: 1 << 10],
-        )
+        if log.isEnabledFor(logging.INFO):
+            log.info(
+                "response interceptor: %s %s %s %s payload: %s, headers: %s, result: %s",
+                request.method,
+                request.url,
+                response.http_version,
+                response.status_code,
+                request.content.decode(),
+                response.headers,
+                response.text[: 1 << 10],
+            )
+        # only a payload that may carry the session expired state is worth parsing
+        if is_login_request or b"Nosession" not in response.content:
+            return
         try:
-            result = response.json()
+            result = orjson.loads(response.content)
             if result.get("state") == "Nosession":
-                self._login()
+                await self._login()
                 raise UnauthorizedError
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             pass
 
-    def _init(self) -> None:
-        self._login()
-        data = self._fetch_user_info()
+    async def _init(self) -> None:
+        await self._login()
+        data = await self._fetch_user_info()
         self.user = {
             "user_id": data["userId"],
             "user_name": data["userName"],
             "staff_id": data["staffId"],
         }
 
-    def _create_token(self) -> str:
+    async def _create_token(self) -> str:
         login_id_type = "EXTERNALUSE"
         timestamp = int(datetime.now().timestamp() * 1_000)
-        url = f"{self.base_url}/RedseaPlatform/vwork/third/api/sso.mob"
+        sign = self._sign_prefix_md5.copy()
+        sign.update(str(timestamp).encode())
+        url = "/RedseaPlatform/vwork/third/api/sso.mob"
         params = {
             "method": "createtoken",
             "loginId": self.login_id,
             "loginIdType": login_id_type,
             "timestamp": timestamp,
-            "sign": utils.get_md5_str("&".join([self.app_secret, self.login_id, str(timestamp)])),
+            "sign": sign.hexdigest(),
         }
-        response = httpx.get(url=url, params=params)
-        result = response.json()
+        response = await self.session.get(url=url, params=params, extensions=LOGIN_EXTENSIONS)
+        result = orjson.loads(response.content)
         if result["state"] == "1":
             return result["result"]
         raise RuntimeError(result["meg"])
 
-    def _login(self) -> None:
-        url = f"{self.base_url}/RedseaPlatform/vwork/third/api/sso.mob"
+    async def _login(self) -> None:
+        url = "/RedseaPlatform/vwork/third/api/sso.mob"
         params = {
             "method": "oauthLogin",
             "client": "app",
             "action": "login",
-            "token": self._create_token(),
+            "token": await self._create_token(),
         }
-        response = httpx.get(url=url, params=params, follow_redirects=True)
-        result = response.json()
+        response = await self.session.get(
+            url=url,
+            params=params,
+            follow_redirects=True,
+            extensions=LOGIN_EXTENSIONS,
+        )
+        result = orjson.loads(response.content)
         if result["state"] == "1":
-            self.session.cookies.update(response.cookies)
             return
         raise RuntimeError(result["tipMsg"])
 
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_fixed(1),
-        retry=retry_if_exception_type((UnauthorizedError, httpx.TimeoutException)),
+        wait=wait_exponential(multiplier=0.5, max=8) + wait_random(0, 0.5),
+        retry=retry_if_exception_type((UnauthorizedError, httpx.TimeoutException, httpx.ConnectError)),
     )
-    def _fetch_user_info(self) -> dict[str, Any]:
-        url = f"{self.base_url}/RedseaPlatform/PtUsers.mc"
+    async def _fetch_user_info(self) -> dict[str, Any]:
+        url = "/RedseaPlatform/PtUsers.mc"
         params = {
             "method": "getCurUserInfo",
         }
-        response = httpx.post(url=url, params=params, cookies=self.session.cookies)
+        response = await self.session.post(url=url, params=params, extensions=LOGIN_EXTENSIONS)
         if not response.text:
-            self._login()
+            await self._login()
             raise UnauthorizedError
-        result = response.json()
+        result = orjson.loads(response.content)
         return result
 
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_fixed(1),
-        retry=retry_if_exception_type((UnauthorizedError, httpx.TimeoutException)),
+        wait=wait_exponential(multiplier=0.5, max=8) + wait_random(0, 0.5),
+        retry=retry_if_exception_type((UnauthorizedError, httpx.TimeoutException, httpx.ConnectError)),
     )
     async def touch_fish(self) -> dict[str, Any]:
         url = "/RedseaPlatform/kqCommonDaka.mc"
-        headers = {
-            "Referer": f"https://{self.hostname}/RedseaPlatform/jsp/kqUni/punchCard/punchCard.jsp?agentId"
-            f"={self.agent_id}=&isQywx=1",
-        }
         params = {
             "method": "daka",
         }
-        longitude = random.choice(self.longitude)
-        latitude = random.choice(self.latitude)
+        longitude = self._rng.choice(self.longitude)
+        latitude = self._rng.choice(self.latitude)
         data = {
             "longitude": longitude,
             "latitude": latitude,
-            "address": self.address,
             "actualAddress": f"{longitude},{latitude}",
-            "agentId": self.agent_id,
-            "imei": "",
-            "ssid": "",
-            "faceUrl": "",
-            "isLeave": "false",
-            "clientType": "1",
-            "mockGpsProbability": "",
+            **self._daka_data,
         }
-        response = await self.session.post(url=url, headers=headers, params=params, data=data)
-        result = response.json()
+        response = await self.session.post(url=url, headers=self._punch_card_headers, params=params, data=data)
+        result = orjson.loads(response.content)
         if result["state"] == "1":
             return result["result"]
         raise RuntimeError(result["meg"])
 
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_fixed(1),
-        retry=retry_if_exception_type((UnauthorizedError, httpx.TimeoutException)),
+        wait=wait_exponential(multiplier=0.5, max=8) + wait_random(0, 0.5),
+        retry=retry_if_exception_type((UnauthorizedError, httpx.TimeoutException, httpx.ConnectError)),
     )
     async def touch_fish_state(self) -> dict[str, Any]:
         url = "/RedseaPlatform/dingDingKqInteface.mc"
-        headers = {
-            "Referer": f"https://{self.hostname}/RedseaPlatform/jsp/kqUni/punchCard/punchCard.jsp?agentId"
-            f"={self.agent_id}=&isQywx=1",
-        }
         params = {
             "method": "getDayTeam",
             "userId": self.user["user_id"],
         }
-        response = await self.session.post(url=url, headers=headers, params=params)
-        result = response.json()
+        response = await self.session.post(url=url, headers=self._punch_card_headers, params=params)
+        result = orjson.loads(response.content)
         if result["state"] == "1":
             return result["result"]
         raise RuntimeError(result["meg"])
@@ -1,14 +1,16 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+import asyncio
+import logging
 import os
-import threading
 from typing import Any, TypedDict, TypeVar
 
 import httpx
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
+import orjson
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential, wait_random
 
-from ..common import config, utils
+from ..common import config, http, utils
 
 log = utils.get_logger(
     name="api-yunyu",
@@ -16,6 +18,8 @@ log = utils.get_logger(
     log_file_path=f"{config.LOG_DIR}/yunyu.log",
 )
 T = TypeVar("T", dict[str, Any], list[Any], str)
+# marks the requests of the login flow, which must skip the unauthorized check of the interceptor
+LOGIN_EXTENSIONS = {"yunyu_login": True}
 
 
 class R(TypedDict):
@@ -37,157 +41,175 @@ class YunYu:
     password: str
     refresh_token: str = ""
     access_token: str = ""
-    lock: threading.RLock
+    _saved_refresh_token: str = ""
+    _saved_access_token: str = ""
+    lock: asyncio.Lock
     session: httpx.AsyncClient
 
     def __init__(self, base_url: str, account: str, password: str) -> None:
         self.base_url = base_url
         self.account = account
         self.password = password
-        self.session = httpx.AsyncClient(base_url=base_url, timeout=httpx.Timeout(24))
+        self.session = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=http.DEFAULT_TIMEOUT,
+            limits=http.DEFAULT_LIMITS,
+            http2=True,
+        )
         self.session.event_hooks.update(
             {
                 "request": [self._request_interceptor],
                 "response": [self._response_interceptor],
             }
         )
-        self.lock = threading.RLock()
-        self._get_refresh_token_from_file()
-        self._get_access_token_from_file()
+        self.lock = asyncio.Lock()
+        os.makedirs(config.CACHE_DIR, mode=0o700, exist_ok=True)
+        self._get_tokens_from_files()
 
-    def _get_refresh_token_from_file(self) -> None:
+    def _get_tokens_from_files(self) -> None:
         """
-        Fetch refresh token from file.
+        Fetch refresh token and access token from files, a missing file is skipped.
         """
-        refresh_token_path = f"{config.CACHE_DIR}/refresh_token"
-        with self.lock:
-            if os.path.exists(refresh_token_path) is False:
-                return
-            with open(refresh_token_path) as fp:
+        try:
+            with open(f"{config.CACHE_DIR}/refresh_token") as fp:
                 self.refresh_token = fp.read()
-
-    def _get_access_token_from_file(self) -> None:
-        """
-        Fetch access token from file.
-        """
-        access_token_path = f"{config.CACHE_DIR}/access_token"
-        with self.lock:
-            if os.path.exists(access_token_path) is False:
-                return
-            with open(access_token_path) as fp:
+        except FileNotFoundError:
+            pass
+        try:
+            with open(f"{config.CACHE_DIR}/access_token") as fp:
                 self.access_token = fp.read()
+        except FileNotFoundError:
+            pass
+        self._saved_refresh_token = self.refresh_token
+        self._saved_access_token = self.access_token
 
     def _save_refresh_token_to_file(self) -> None:
         """
-        Persistent refresh token.
+        Persistent refresh token, skip writing if it is unchanged.
         """
         refresh_token_path = f"{config.CACHE_DIR}/refresh_token"
-        with self.lock:
-            if os.path.exists(config.CACHE_DIR) is False:
-                os.mkdir(config.CACHE_DIR, mode=0x700)
-            with open(refresh_token_path, "w+") as fp:
-                fp.write(self.refresh_token)
+        if self.refresh_token == self._saved_refresh_token:
+            return
+        with open(refresh_token_path, "w+") as fp:
+            fp.write(self.refresh_token)
+        self._saved_refresh_token = self.refresh_token
 
     def _save_access_token_to_file(self) -> None:
         """
-        Persistent access token.
+        Persistent access token, skip writing if it is unchanged.
         """
         access_token_path = f"{config.CACHE_DIR}/access_token"
-        with self.lock:
-            if os.path.exists(config.CACHE_DIR) is False:
-                os.mkdir(config.CACHE_DIR, mode=0x700)
-            with open(access_token_path, "w+") as fp:
-                fp.write(self.access_token)
+        if self.access_token == self._saved_access_token:
+            return
+        with open(access_token_path, "w+") as fp:
+            fp.write(self.access_token)
+        self._saved_access_token = self.access_token
 
     async def _request_interceptor(self, request: httpx.Request) -> None:
-        request.headers.update({"Cookie": f"SESSION={self.access_token}"})
-        log.info(
-            "request interceptor: %s %s, payload: %s, headers: %s",
-            request.method,
-            request.url,
-            request.content.decode(),
-            request.headers,
-        )
+        # the login flow doesn't authenticate by the current, maybe stale, session
+        if not request.extensions.get("yunyu_login"):
+            request.headers["Cookie"] = f"SESSION={self.access_token}"
+        if log.isEnabledFor(logging.INFO):
+            log.info(
+                "request interceptor: %s %s, payload: %s, headers: %s",
+                request.method,
+                request.url,
+                request.content.decode(),
+                request.headers,
+            )
+
+    @staticmethod
+    def _json(response: httpx.Response) -> R:
+        """
+        Parse the response body, the result is cached on the response so that it is parsed only once.
+        """
+        if "parsed_json" not in response.extensions:
+            response.extensions["parsed_json"] = orjson.loads(response.content)
+        return response.extensions["parsed_json"]
 
     async def _response_interceptor(self, response: httpx.Response) -> None:
         await response.aread()
         request = response.request
-        log.info(
-            "response interceptor: %s %s %s %s payload: %s, headers: %s, result: %s",
-            request.method,
-            request.url,
-            response.http_version,
-            response.status_code,
-            request.content.decode(),
-            response.headers,
-            response.text[: 1 << 10],
-        )
-        result: R = response.json()
+        if log.isEnabledFor(logging.INFO):
+            log.info(
+                "response interceptor: %s %s %s %s payload: %s, headers: %s, result: %s",
+                request.method,
+                request.url,
+                response.http_version,
+                response.status_code,
+                request.content.decode(),
+                response.headers,
+                response.text[: 1 << 10],
+            )
+        if request.extensions.get("yunyu_login"):
+            return
+        result: R = self._json(response)
         if result["code"] == -5:
-            self._refresh_access_token()
+            async with self.lock:
+                # only the first of the concurrent unauthorized requests refreshes the token,
+                # the others see the new token once they acquire the lock and just retry
+                if request.headers.get("Cookie") == f"SESSION={self.access_token}":
+                    await self._refresh_access_token()
             raise UnauthorizedError
 
-    def _apply_token(self) -> None:
+    async def _apply_token(self) -> None:
         """
         Fetch infinite refresh token by access token.
         """
-        url = f"{self.base_url}/user/login/applyToken"
-        cookies = {
-            "SESSION": self.access_token,
+        url = "/user/login/applyToken"
+        headers = {
+            "Cookie": f"SESSION={self.access_token}",
         }
-        response = httpx.post(url=url, cookies=cookies)
-        result: R = response.json()
+        response = await self.session.post(url=url, headers=headers, extensions=LOGIN_EXTENSIONS)
+        result: R = self._json(response)
         if result["success"] is False:
-            log.error("failed to apply token, param: %s, result: %s", cookies, result)
+            log.error("failed to apply token, access_token: %s, result: %s", self.access_token, result)
             return
-        with self.lock:
-            self.refresh_token = result["data"]
+        self.refresh_token = result["data"]
         self._save_refresh_token_to_file()
         log.info("apply token success, refresh_token: %s", self.refresh_token)
 
-    def _login(self) -> None:
+    async def _login(self) -> None:
         """
         Login, and then fetch refresh token and access token.
         """
-        url = f"{self.base_url}/user/login"
+        url = "/user/login"
         data = {
             "account": self.account,
             "password": self.password,
         }
-        response = httpx.post(url=url, json=data)
-        result: R = response.json()
+        response = await self.session.post(url=url, json=data, extensions=LOGIN_EXTENSIONS)
+        result: R = self._json(response)
         if result["success"] is False:
             log.error("failed to login, param: %s, result: %s", data, result)
             return
-        with self.lock:
-            self.access_token = result["data"].get("accessToken")
+        self.access_token = result["data"].get("accessToken")
         self._save_access_token_to_file()
         log.info("login success, access_token: %s", self.access_token)
-        self._apply_token()
+        await self._apply_token()
 
-    def _refresh_access_token(self) -> None:
+    async def _refresh_access_token(self) -> None:
         """
-        Fetch access token by refresh token.
+        Fetch access token by refresh token, must be called with the lock held.
         """
-        url = f"{self.base_url}/user/login/loginByToken"
+        url = "/user/login/loginByToken"
         data = {
             "token": self.refresh_token,
         }
-        response = httpx.post(url=url, json=data)
-        result: R = response.json()
+        response = await self.session.post(url=url, json=data, extensions=LOGIN_EXTENSIONS)
+        result: R = self._json(response)
         if result["code"] != 0:
             log.error("failed to refresh token: param: %s, result: %s", data, result)
-            self._login()
+            await self._login()
             return
-        with self.lock:
-            self.access_token = result["data"].get("accessToken")
+        self.access_token = result["data"].get("accessToken")
         self._save_access_token_to_file()
         log.info("refresh token success, access_token: %s", self.access_token)
 
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_fixed(1),
-        retry=retry_if_exception_type((UnauthorizedError, httpx.TimeoutException)),
+        wait=wait_exponential(multiplier=0.5, max=8) + wait_random(0, 0.5),
+        retry=retry_if_exception_type((UnauthorizedError, httpx.TimeoutException, httpx.ConnectError)),
     )
     async def fetch_prepay_energy_bills(self, page: int = 1) -> dict[str, Any]:
         url = "/smart/prepayEnergyList/page"
@@ -195,20 +217,36 @@ class YunYu:
             "pageNo": page,
         }
         response = await self.session.post(url=url, json=data)
-        result: R = response.json()
+        result: R = self._json(response)
         if result["success"]:
             return result["data"]
         raise RuntimeError(result["msg"])
 
+    async def fetch_all_prepay_energy_bills(
+        self, pages: int, concurrency: int = 10
+    ) -> list[dict[str, Any] | BaseException]:
+        """
+        Fetch the first pages of prepay energy bills concurrently,
+        a failed page is returned as its exception instead of aborting the others.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(page: int) -> dict[str, Any]:
+            async with semaphore:
+                return await self.fetch_prepay_energy_bills(page)
+
+        tasks = [fetch(page) for page in range(1, pages + 1)]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_fixed(1),
-        retry=retry_if_exception_type((UnauthorizedError, httpx.TimeoutException)),
+        wait=wait_exponential(multiplier=0.5, max=8) + wait_random(0, 0.5),
+        retry=retry_if_exception_type((UnauthorizedError, httpx.TimeoutException, httpx.ConnectError)),
     )
     async def fetch_prepay_balance(self) -> float | str:
         url = "/user/prepayBalance"
         response = await self.session.get(url=url)
-        result: R = response.json()
+        result: R = self._json(response)
         if result["success"]:
             return result["data"]["balance"]
         raise RuntimeError(result["msg"])
@@ -1,13 +1,15 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
-from collections.abc import Callable
+import asyncio
+from collections.abc import Awaitable, Callable
 from contextlib import asynccontextmanager
 from datetime import datetime
 from enum import Enum
-from typing import Any
+from typing import Any, TypedDict
 
-from apscheduler import AsyncScheduler, ScheduleLookupError
+import orjson
+from apscheduler import AsyncScheduler, Schedule
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
 from fastapi import Body, FastAPI, Path, Request, Response, status
@@ -16,69 +18,87 @@ from fastapi.exceptions import (
     StarletteHTTPException,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
 from starlette.types import ASGIApp, Receive, Scope, Send
 
+from . import api, notification
 from .common import config, utils
 from .scheduler import redsea_scheduler, yunyu_scheduler
 
-# simple database
-db: list["Task"] = []
+# the server runs every task, so resolve all their clients and settings up front,
+# a missing setting exits at startup instead of killing the scheduler when the first task runs
+_ = (
+    config.API_TOKEN,
+    config.YUNYU_CRON,
+    config.REDSEA_CRON,
+    config.WORKDAY_BASE_URL,
+    api.yunyu,
+    api.redsea,
+    notification.ntfy,
+)
+
+# simple database, task id -> task type
+db: dict[str, "TaskType"] = {}
+# cron expression of the cron tasks, task id -> cron expression
+crontabs: dict[str, str] = {}
 async_scheduler = AsyncScheduler()
 log = utils.get_logger("uvicorn")
 DATETIME_FORMATTER = "%Y-%m-%d %H:%M:%S"
 
 
-class ApiResult(BaseModel):
-    code: str = str(status.HTTP_200_OK)
-    success: bool = True
-    message: str = "OK"
-    data: Any | None = None
+class ApiResult:
+    @staticmethod
+    def of(status_code: int, success: bool, message: str, data: Any | None = None) -> dict[str, Any]:
+        """
+        Build the result, the data is omitted if it is None.
+        """
+        return {
+            "code": str(status_code),
+            "success": success,
+            "message": message,
+            **({"data": data} if data is not None else {}),
+        }
 
     @staticmethod
     def ok(data: Any | None = None) -> Response:
-        result = ApiResult(data=data)
-        return Response(
-            content=result.model_dump_json(exclude_none=True),
+        return ORJSONResponse(
+            content=ApiResult.of(status.HTTP_200_OK, True, "OK", data),
             status_code=status.HTTP_200_OK,
         )
 
     @staticmethod
     def e(status_code: int, message: str):
-        result = ApiResult(
-            code=str(status_code),
-            success=False,
-            message=message,
-        )
-        return Response(
-            content=result.model_dump_json(exclude_none=True),
+        return ORJSONResponse(
+            content=ApiResult.of(status_code, False, message),
             status_code=status_code,
         )
 
 
+UNAUTHORIZED_CONTENT = orjson.dumps(ApiResult.of(status.HTTP_401_UNAUTHORIZED, False, "Unauthorized"))
+
+
 class TaskType(Enum):
     YUNYU = "yunyu"
     REDSEA = "redsea"
 
 
-class DateTask(BaseModel):
+class DateTask(TypedDict):
     id: str
     run_time: str
     task_type: TaskType
 
 
-class CronTask(BaseModel):
+class _CronTask(TypedDict):
     id: str
     cron: str
     next_run_time: str
-    last_run_time: str | None
     running: bool
     task_type: TaskType
 
 
-class Task(BaseModel):
-    id: str
-    type: TaskType
+class CronTask(_CronTask, total=False):
+    # omitted if the task has never been run
+    last_run_time: str
 
 
 class SchedulerMiddleware:
@@ -102,24 +122,37 @@ class SchedulerMiddleware:
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     log.info("API_TOKEN: %s", config.API_TOKEN)
+    tasks: list[Awaitable[str]] = []
+    task_types: list[TaskType] = []
+    crons: list[str] = []
     for cron in config.YUNYU_CRON:
-        task_id = await async_scheduler.add_schedule(
-            yunyu_scheduler.fetch_daily_bills,
-            trigger=CronTrigger.from_crontab(cron),
-        )
-        db.append(Task(id=task_id, type=TaskType.YUNYU))
         log.info("starting yunyu cron: %s", cron)
-    for cron in config.REDSEA_CRON:
-        task_id = await async_scheduler.add_schedule(
-            redsea_scheduler.lazy_with_random_delay_in_workday,
-            trigger=CronTrigger.from_crontab(cron),
+        tasks.append(
+            async_scheduler.add_schedule(
+                yunyu_scheduler.fetch_daily_bills,
+                trigger=CronTrigger.from_crontab(cron),
+            )
         )
-        db.append(Task(id=task_id, type=TaskType.REDSEA))
+        task_types.append(TaskType.YUNYU)
+        crons.append(cron)
+    for cron in config.REDSEA_CRON:
         log.info("starting redsea cron: %s", cron)
+        tasks.append(
+            async_scheduler.add_schedule(
+                redsea_scheduler.lazy_with_random_delay_in_workday,
+                trigger=CronTrigger.from_crontab(cron),
+            )
+        )
+        task_types.append(TaskType.REDSEA)
+        crons.append(cron)
+    # register all the schedules concurrently
+    task_ids = await asyncio.gather(*tasks)
+    db.update(zip(task_ids, task_types))
+    crontabs.update(zip(task_ids, crons))
     yield
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.add_middleware(SchedulerMiddleware, scheduler=async_scheduler)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
@@ -129,7 +162,11 @@ async def interceptor(request: Request, call_next) -> Response:
     token = request.headers.get("Authorization")
     if token == config.API_TOKEN:
         return await call_next(request)
-    return ApiResult.e(status.HTTP_401_UNAUTHORIZED, "Unauthorized")
+    return Response(
+        content=UNAUTHORIZED_CONTENT,
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        media_type="application/json",
+    )
 
 
 @app.exception_handler(Exception)
@@ -147,27 +184,39 @@ async def validation_exception_handler(request: Request, e: RequestValidationErr
     return ApiResult.e(status.HTTP_400_BAD_REQUEST, f"incorrect request parameter: {e.errors()}")
 
 
+async def fetch_schedules() -> dict[str, Schedule]:
+    """
+    Fetch all the schedules in one call, and remove the tasks whose schedule no longer exists from db.
+    """
+    schedules = {schedule.id: schedule for schedule in await async_scheduler.get_schedules()}
+    for task_id in db.keys() - schedules.keys():
+        db.pop(task_id, None)
+        crontabs.pop(task_id, None)
+    return schedules
+
+
 @app.get("/api/task/cron")
 async def get_cron_task() -> Response:
-    data = []
-    global db
-    for task in db[:]:
-        try:
-            schedule = await async_scheduler.get_schedule(task.id)
-        except ScheduleLookupError:
-            db.remove(task)
-            continue
+    data: list[CronTask] = []
+    schedules = await fetch_schedules()
+    for task_id, task_type in db.items():
+        schedule = schedules[task_id]
         if not isinstance(schedule.trigger, CronTrigger):
             continue
         trigger: CronTrigger = schedule.trigger
         data.append(
             CronTask(
-                id=task.id,
-                cron=" ".join([trigger.minute, trigger.hour, trigger.day, trigger.month, trigger.day_of_week]),
+                id=task_id,
+                cron=crontabs.get(task_id)
+                or " ".join([trigger.minute, trigger.hour, trigger.day, trigger.month, trigger.day_of_week]),
                 next_run_time=schedule.next_fire_time.strftime(DATETIME_FORMATTER),
-                last_run_time=schedule.last_fire_time.strftime(DATETIME_FORMATTER) if schedule.last_fire_time else None,
                 running=not schedule.paused,
-                task_type=task.type,
+                task_type=task_type,
+                **(
+                    {"last_run_time": schedule.last_fire_time.strftime(DATETIME_FORMATTER)}
+                    if schedule.last_fire_time
+                    else {}
+                ),
             )
         )
     return ApiResult.ok(data=data)
@@ -187,22 +236,18 @@ async def resume_cron_task(task_id: str = Path(alias="id")) -> Response:
 
 @app.get("/api/task/date")
 async def get_date_task() -> Response:
-    data = []
-    global db
-    for task in db[:]:
-        try:
-            schedule = await async_scheduler.get_schedule(task.id)
-        except ScheduleLookupError:
-            db.remove(task)
-            continue
+    data: list[DateTask] = []
+    schedules = await fetch_schedules()
+    for task_id, task_type in db.items():
+        schedule = schedules[task_id]
         if not isinstance(schedule.trigger, DateTrigger):
             continue
         trigger: DateTrigger = schedule.trigger
         data.append(
             DateTask(
-                id=task.id,
+                id=task_id,
                 run_time=trigger.run_time.strftime(DATETIME_FORMATTER),
-                task_type=task.type,
+                task_type=task_type,
             )
         )
     return ApiResult.ok(data=data)
@@ -230,8 +275,7 @@ async def new_task(
         )
     )
     # update task into db
-    global db
-    db.append(Task(id=task_id, type=task_type))
+    db[task_id] = task_type
     data = {
         "id": task_id,
         **({"run_time": run_time.strftime(DATETIME_FORMATTER)} if run_time else {}),
@@ -248,12 +292,12 @@ async def delete_date_task(task_id: str = Path(alias="id")) -> Response:
 
 @app.delete("/api/task/date")
 async def delete_all_date_task() -> Response:
-    for task in db:
-        try:
-            schedule = await async_scheduler.get_schedule(task.id)
-        except ScheduleLookupError:
-            continue
-        if not isinstance(schedule.trigger, DateTrigger):
-            continue
-        await async_scheduler.remove_schedule(task.id)
+    schedules = await fetch_schedules()
+    await asyncio.gather(
+        *(
+            async_scheduler.remove_schedule(task_id)
+            for task_id in db
+            if isinstance(schedules[task_id].trigger, DateTrigger)
+        )
+    )
     return ApiResult.ok()
@@ -2,38 +2,64 @@
 # -*- coding: UTF-8 -*-
 
 import logging
+from collections.abc import Callable
+from typing import Any
 
 from . import utils
 
-# yunyu
-YUNYU_BASE_URL = utils.get_required_env("YUNYU_BASE_URL")
-YUNYU_ACCOUNT = utils.get_required_env("YUNYU_ACCOUNT")
-YUNYU_PASSWORD = utils.get_required_env("YUNYU_PASSWORD")
-YUNYU_CRON = utils.get_required_env_list("YUNYU_CRON")
+# Every setting is resolved on first access, so a missing environment variable
+# only fails the code path that actually needs it.
+_SETTINGS: dict[str, Callable[[str], Any]] = {
+    # yunyu
+    "YUNYU_BASE_URL": utils.get_required_env,
+    "YUNYU_ACCOUNT": utils.get_required_env,
+    "YUNYU_PASSWORD": utils.get_required_env,
+    "YUNYU_CRON": utils.get_required_env_list,
+    # red sea
+    "REDSEA_BASE_URL": utils.get_required_env,
+    "REDSEA_USER_AGENT": utils.get_required_env,
+    "REDSEA_APP_SECRET": utils.get_required_env,
+    "REDSEA_LOGIN_ID": utils.get_required_env,
+    "REDSEA_AGENT_ID": utils.get_required_env,
+    "REDSEA_LAZY_LONGITUDE": utils.get_required_env_list,
+    "REDSEA_LAZY_LATITUDE": utils.get_required_env_list,
+    "REDSEA_LAZY_ADDRESS": utils.get_required_env,
+    "REDSEA_CRON": utils.get_required_env_list,
+    # ntfy
+    "NTFY_BASE_URL": utils.get_required_env,
+    "NTFY_USERNAME": utils.get_required_env,
+    "NTFY_PASSWORD": utils.get_required_env,
+    # workday
+    "WORKDAY_BASE_URL": utils.get_required_env,
+    # server
+    "API_TOKEN": lambda key: utils.get_env(key) or utils.generate_random_str(32),
+    # basic config
+    "LOG_DIR": lambda key: utils.get_env(key, "log"),
+    "CACHE_DIR": lambda key: utils.get_env(key, "cache"),
+    "LOG_LEVEL": lambda key: utils.get_env(key, logging.INFO),
+}
 
-# red sea
-REDSEA_BASE_URL = utils.get_required_env("REDSEA_BASE_URL")
-REDSEA_USER_AGENT = utils.get_required_env("REDSEA_USER_AGENT")
-REDSEA_APP_SECRET = utils.get_required_env("REDSEA_APP_SECRET")
-REDSEA_LOGIN_ID = utils.get_required_env("REDSEA_LOGIN_ID")
-REDSEA_AGENT_ID = utils.get_required_env("REDSEA_AGENT_ID")
-REDSEA_LAZY_LONGITUDE = utils.get_required_env_list("REDSEA_LAZY_LONGITUDE")
-REDSEA_LAZY_LATITUDE = utils.get_required_env_list("REDSEA_LAZY_LATITUDE")
-REDSEA_LAZY_ADDRESS = utils.get_required_env("REDSEA_LAZY_ADDRESS")
-REDSEA_CRON = utils.get_required_env_list("REDSEA_CRON")
+# the types of the settings, only declared, the values are resolved by __getattr__
+YUNYU_BASE_URL: str
+YUNYU_ACCOUNT: str
+YUNYU_PASSWORD: str
+YUNYU_CRON: list[str]
+REDSEA_BASE_URL: str
+REDSEA_USER_AGENT: str
+REDSEA_APP_SECRET: str
+REDSEA_LOGIN_ID: str
+REDSEA_AGENT_ID: str
+REDSEA_LAZY_LONGITUDE: list[str]
+REDSEA_LAZY_LATITUDE: list[str]
+REDSEA_LAZY_ADDRESS: str
+REDSEA_CRON: list[str]
+NTFY_BASE_URL: str
+NTFY_USERNAME: str
+NTFY_PASSWORD: str
+WORKDAY_BASE_URL: str
+API_TOKEN: str
+LOG_DIR: str
+CACHE_DIR: str
+LOG_LEVEL: int | str
 
-# ntfy
-NTFY_BASE_URL = utils.get_required_env("NTFY_BASE_URL")
-NTFY_USERNAME = utils.get_required_env("NTFY_USERNAME")
-NTFY_PASSWORD = utils.get_required_env("NTFY_PASSWORD")
-
-# workday
-WORKDAY_BASE_URL = utils.get_required_env("WORKDAY_BASE_URL")
-
-# server
-API_TOKEN = utils.get_env("API_TOKEN") or utils.generate_random_str(32)
-
-# basic config
-LOG_DIR = utils.get_env("LOG_DIR", "log")
-CACHE_DIR = utils.get_env("CACHE_DIR", "cache")
-LOG_LEVEL = utils.get_env("LOG_LEVEL", logging.INFO)
+__getattr__ = utils.lazy_module_getattr(globals(), _SETTINGS)
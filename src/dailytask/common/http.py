@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import httpx
+
+# fail fast on connect and pool waits, while giving slow responses enough time to be read
+DEFAULT_TIMEOUT = httpx.Timeout(connect=3.0, read=20.0, write=10.0, pool=5.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=30)
+# for the one-off requests which don't need their own base url, hooks or cookies
+shared_client = httpx.AsyncClient(
+    timeout=DEFAULT_TIMEOUT,
+    limits=DEFAULT_LIMITS,
+    http2=True,
+)
@@ -7,12 +7,27 @@ import os
 import secrets
 import string
 import sys
+from collections.abc import Callable
+from datetime import date
 from logging.handlers import RotatingFileHandler
-from typing import TypeVar
+from typing import Any, TypeVar
 
-import httpx
+import orjson
+
+from . import http
 
 _T = TypeVar("_T")
+# environment variables don't change after the process starts, read them only once
+_ENV_SNAPSHOT = dict(os.environ)
+# whether a day is a workday doesn't change within the day, base url -> (day, is workday)
+_workday_cache: dict[str, tuple[date, bool]] = {}
+_RANDOM_STR_CHARACTERS = string.ascii_letters + string.digits + string.punctuation
+# log output formatter, shared by the handlers of all the loggers
+_LOG_FORMATTER = logging.Formatter(
+    fmt="%(asctime)s.%(msecs)d 【%(name)s】 %(levelname)s %(process)d --- [%(threadName)s-%(thread)d] "
+    "<%(pathname)s-line:%(lineno)d>: %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
 
 
 def get_env(key: str, default: _T = "") -> _T | str:
@@ -20,18 +35,19 @@ def get_env(key: str, default: _T = "") -> _T | str:
     Get an environment variable, return empty str if it doesn't exist.
     The optional second argument can specify an alternate default.
     """
-    return os.getenv(key) or default
+    return _ENV_SNAPSHOT.get(key) or default
 
 
 def get_env_list(key: str, default: list[_T] | None = None) -> list[_T] | list[str]:
     """
-    Get an environment variable, which split by comma, return None if it doesn't exist.
+    Get an environment variable, which split by comma and stripped, return None if it doesn't exist.
     The optional second argument can specify an alternate default.
     """
     value = get_env(key)
     if not value:
         return default or []
-    return value.split(",")
+    # surrounding whitespace and empty items are dropped, the items are interned since they live for the whole process
+    return [sys.intern(item) for item in map(str.strip, value.split(",")) if item]
 
 
 def get_required_env(key: str) -> str:
@@ -57,32 +73,59 @@ def get_required_env_list(key: str) -> list[str]:
     return value
 
 
+def lazy_module_getattr(namespace: dict[str, Any], resolvers: dict[str, Callable[[str], Any]]) -> Callable[[str], Any]:
+    """
+    Build a module level `__getattr__`, which resolves an attribute by its resolver on first access.
+    The value is cached in the module namespace, so later accesses don't go through `__getattr__` anymore.
+    """
+
+    def __getattr__(name: str) -> Any:
+        if name not in resolvers:
+            raise AttributeError(f"module {namespace['__name__']!r} has no attribute {name!r}")
+        value = resolvers[name](name)
+        namespace[name] = value
+        return value
+
+    return __getattr__
+
+
 def get_md5_str(data: str) -> str:
     """
     Get MD5 digest str.
     """
-    md5 = hashlib.md5()
-    md5.update(data.encode())
-    return md5.hexdigest()
+    # only used for request signing, not for security
+    return hashlib.md5(data.encode(), usedforsecurity=False).hexdigest()
 
 
 def generate_random_str(length: int) -> str:
     """
     Generate securer random str.
     """
-    characters = string.ascii_letters + string.digits + string.punctuation
-    return "".join(secrets.choice(characters) for _ in range(length))
+    # a random byte maps to a character uniformly only if it is below the largest multiple of the charset size
+    limit = 256 - 256 % len(_RANDOM_STR_CHARACTERS)
+    chars: list[str] = []
+    while len(chars) < length:
+        for b in secrets.token_bytes(2 * (length - len(chars))):
+            if b < limit:
+                chars.append(_RANDOM_STR_CHARACTERS[b % len(_RANDOM_STR_CHARACTERS)])
+    return "".join(chars[:length])
 
 
-def is_workday(base_url: str) -> bool:
+async def is_workday(base_url: str) -> bool:
     """
-    Determine whether the today is a workday.
+    Determine whether the today is a workday, the result is cached for the rest of the day.
     """
+    today = date.today()
+    cached = _workday_cache.get(base_url)
+    if cached is not None and cached[0] == today:
+        return cached[1]
     url = f"{base_url}/workday/today"
-    response = httpx.get(url=url, timeout=httpx.Timeout(24))
-    result = response.json()
+    response = await http.shared_client.get(url=url)
+    result = orjson.loads(response.content)
     assert result["success"] is True
-    return result["data"]["isWorkday"]
+    value = result["data"]["isWorkday"]
+    _workday_cache[base_url] = (today, value)
+    return value
 
 
 def get_logger(name: str, log_level: int = logging.INFO, log_file_path: str = None) -> logging.Logger:
@@ -92,14 +135,8 @@ def get_logger(name: str, log_level: int = logging.INFO, log_file_path: str = No
     if logger.handlers:
         return logger
     logger.setLevel(log_level)
-    # Console handler output formatter
-    formatter = (
-        "%(asctime)s.%(msecs)d 【%(name)s】 %(levelname)s %(process)d --- [%(threadName)s-%(thread)d] "
-        "<%(pathname)s-line:%(lineno)d>: %(message)s"
-    )
-    date_format = "%Y-%m-%d %H:%M:%S"
     console_handler = logging.StreamHandler()
-    console_handler.setFormatter(logging.Formatter(fmt=formatter, datefmt=date_format))
+    console_handler.setFormatter(_LOG_FORMATTER)
     logger.addHandler(console_handler)
     # Close handler
     console_handler.close()
@@ -109,8 +146,7 @@ def get_logger(name: str, log_level: int = logging.INFO, log_file_path: str = No
         return logger
 
     # Create directory first if it doesn't exist
-    if not os.path.exists(os.path.dirname(log_file_path)):
-        os.mkdir(os.path.dirname(log_file_path), mode=0x700)
+    os.makedirs(os.path.dirname(log_file_path) or ".", mode=0o700, exist_ok=True)
     # File handler settings
     file_handler = RotatingFileHandler(
         filename=log_file_path,
@@ -119,8 +155,7 @@ def get_logger(name: str, log_level: int = logging.INFO, log_file_path: str = No
         backupCount=3,
         encoding="utf-8",
     )
-    # File handler output formatter
-    file_handler.setFormatter(logging.Formatter(fmt=formatter, datefmt=date_format))
+    file_handler.setFormatter(_LOG_FORMATTER)
     logger.addHandler(file_handler)
     # Close handler
     file_handler.close()
@@ -3,10 +3,8 @@
 
 import argparse
 import asyncio
+import sys
 
-import uvicorn
-
-from .app import app
 from .common import config
 from .scheduler import redsea_scheduler, yunyu_scheduler
 
@@ -18,6 +16,10 @@ async def main() -> None:
     parser.add_argument("--server", action="store_true", help="")
     parser.add_argument("--debug", action="store_true", help="")
     args = parser.parse_args()
+    # the one-off runs start their tasks eagerly, a task that completes without blocking is never scheduled,
+    # not when serving, apscheduler's anyio task group breaks once its tasks start eagerly
+    if not args.server and sys.version_info >= (3, 12):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
     if args.yunyu:
         await yunyu_scheduler.fetch_daily_bills()
         return
@@ -27,6 +29,12 @@ async def main() -> None:
             return
         await redsea_scheduler.lazy_with_random_delay_in_workday()
     if args.server:
+        # the server dependencies are only imported when needed, the one-off task runs don't pay for them
+        import uvicorn
+
+        # through the package hook, which keeps the package attribute bound to the app instead of the submodule
+        from . import app
+
         host = "127.0.0.1" if args.debug else "0.0.0.0"
         port = 17777 if args.debug else 7777
         uvicorn_config = uvicorn.Config(app, host=host, port=port, log_level=config.LOG_LEVEL, reload=args.debug)
@@ -35,4 +43,10 @@ async def main() -> None:
 
 
 def run() -> None:
-    asyncio.run(main())
+    # uvloop comes with uvicorn[standard] but is not available on every platform
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -1,11 +1,19 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
-from dailytask.common import config
+from collections.abc import Callable
+from typing import Any
+
+from dailytask.common import config, utils
 
 from ._ntfy import NtfyAttachment, NtfyClient, NtfyPriority
 
-ntfy = NtfyClient(config.NTFY_BASE_URL, config.NTFY_USERNAME, config.NTFY_PASSWORD)
+# the client is built on first access, so the ntfy settings are only required once a notification is sent
+ntfy: NtfyClient
+_CLIENTS: dict[str, Callable[[str], Any]] = {
+    "ntfy": lambda _: NtfyClient(config.NTFY_BASE_URL, config.NTFY_USERNAME, config.NTFY_PASSWORD),
+}
+__getattr__ = utils.lazy_module_getattr(globals(), _CLIENTS)
 
 __all__ = [
     "ntfy",
@@ -1,16 +1,19 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+import asyncio
+import base64
 from collections.abc import Sequence
 from enum import Enum
 from typing import Any
 
 import httpx
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
+import orjson
 
-from ..common import config, utils
+from ..common import config, http, utils
 
 log = utils.get_logger(name="ntfy", log_level=config.LOG_LEVEL, log_file_path=f"{config.LOG_DIR}/ntfy.log")
+JSON_HEADERS = {"Content-Type": "application/json"}
 
 
 class NtfyPriority(Enum):
@@ -37,16 +40,18 @@ class NtfyClient:
     session: httpx.AsyncClient
 
     def __init__(self, base_url: str, username: str | None = None, password: str = None) -> None:
+        headers = {}
+        # the credentials never change, build the basic auth header once instead of per request
+        if username and password:
+            token = base64.b64encode(f"{username}:{password}".encode()).decode()
+            headers["Authorization"] = f"Basic {token}"
         self.session = httpx.AsyncClient(
             base_url=base_url,
-            auth=httpx.BasicAuth(username, password) if username and password else None,
+            headers=headers,
+            limits=http.DEFAULT_LIMITS,
+            http2=True,
         )
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_fixed(1),
-        retry=retry_if_exception_type(httpx.TimeoutException),
-    )
     async def send(
         self,
         topic: str,
@@ -61,23 +66,42 @@ class NtfyClient:
         email: str | None = None,
         attachment: NtfyAttachment | None = None,
     ) -> dict[str, Any]:
-        data = {
+        data: dict[str, Any] = {
             "topic": topic,
             "message": message,
-            **({"title": title} if title else {}),
-            **({"priority": priority.value} if priority else {}),
-            **({"tags": [tags] if isinstance(tags, str) else list(tags)} if tags else {}),
-            **({"click": click} if click else {}),
-            **({"icons": icons} if icons else {}),
-            **({"markdown": markdown} if markdown else {}),
-            **({"delay": delay} if delay else {}),
-            **({"email": email} if email else {}),
-            **({"filename": attachment.filename} if attachment else {}),
-            **({"attach": attachment.url} if attachment and attachment.url else {}),
         }
+        if title:
+            data["title"] = title
+        if priority:
+            data["priority"] = priority.value
+        if tags:
+            data["tags"] = [tags] if isinstance(tags, str) else list(tags)
+        if click:
+            data["click"] = click
+        if icons:
+            data["icons"] = icons
+        if markdown:
+            data["markdown"] = markdown
+        if delay:
+            data["delay"] = delay
+        if email:
+            data["email"] = email
+        if attachment:
+            data["filename"] = attachment.filename
+            if attachment.url:
+                data["attach"] = attachment.url
         # TODO support attach local file
-        response = await self.session.put(url="/", json=data)
-        result = response.json()
+        content = orjson.dumps(data)
+        # retry on timeout, up to 3 attempts with 1 second in between
+        for attempt in range(1, 4):
+            try:
+                response = await self.session.put(url="/", content=content, headers=JSON_HEADERS)
+                break
+            except httpx.TimeoutException:
+                if attempt == 3:
+                    raise
+                await asyncio.sleep(1)
+        result = orjson.loads(response.content)
         if result.get("error") is not None:
             log.error("ntfy send error, result: %s", result)
             return result
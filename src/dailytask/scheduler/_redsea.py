@@ -5,41 +5,44 @@ import asyncio
 import random
 import traceback
 
-from ..api import redsea
+from .. import api, notification
 from ..common import config, utils
-from ..notification import NtfyPriority, ntfy
+from ..notification import NtfyPriority
 
 log = utils.get_logger(
     name="scheduler-redsea",
     log_level=config.LOG_LEVEL,
     log_file_path=f"{config.LOG_DIR}/redsea.log",
 )
+# the punch card states which are fine
+_OK_STATES: frozenset[str] = frozenset(("正常", "休息"))
+# the time and the state of the first punch card that has one wins
+_START_TIME_KEYS = ("sbDkTime", "sbDkTime2", "sbDkTime3")
+_START_STATE_KEYS = ("sbStatusName", "sbStatusName2", "sbStatusName3")
+_END_TIME_KEYS = ("xbDkTime", "xbDkTime2", "xbDkTime3")
+_END_STATE_KEYS = ("xbStatusName", "xbStatusName2", "xbStatusName3")
 
 
 async def lazy() -> None:
     log.info("touching fish start...")
     try:
-        touch_fish_data = await redsea.touch_fish()
+        touch_fish_data = await api.redsea.touch_fish()
         current_state = touch_fish_data.get("msg")
-        data = await redsea.touch_fish_state()
+        data = await api.redsea.touch_fish_state()
         data = data.get("kqCountSimple", {})
-        touch_fish_start_time = data.get("sbDkTime") or data.get("sbDkTime2") or data.get("sbDkTime3")
-        touch_fish_start_state = (
-            data.get("sbStatusName") or data.get("sbStatusName2") or data.get("sbStatusName3") or "正常"
-        )
-        touch_fish_start_state_emoji = "✅" if touch_fish_start_state in ["正常", "休息"] else "❌"
-        touch_fish_end_time = data.get("xbDkTime") or data.get("xbDkTime2") or data.get("xbDkTime3")
-        touch_fish_end_state = (
-            data.get("xbStatusName") or data.get("xbStatusName2") or data.get("xbStatusName3") or "正常"
-        )
-        touch_fish_end_state_emoji = "✅" if touch_fish_end_state in ["正常", "休息"] else "❌"
+        touch_fish_start_time = next(filter(None, map(data.get, _START_TIME_KEYS)), None)
+        touch_fish_start_state = next(filter(None, map(data.get, _START_STATE_KEYS)), "正常")
+        touch_fish_start_state_emoji = "✅" if touch_fish_start_state in _OK_STATES else "❌"
+        touch_fish_end_time = next(filter(None, map(data.get, _END_TIME_KEYS)), None)
+        touch_fish_end_state = next(filter(None, map(data.get, _END_STATE_KEYS)), "正常")
+        touch_fish_end_state_emoji = "✅" if touch_fish_end_state in _OK_STATES else "❌"
         message = f"💤：{touch_fish_start_time} {touch_fish_start_state} {touch_fish_start_state_emoji}"
         if touch_fish_end_time:
             message += f"\n🎉：{touch_fish_end_time} {touch_fish_end_state} {touch_fish_end_state_emoji}"
-        await ntfy.send(topic="daily", title=f"⏰{current_state}", message=message)
+        await notification.ntfy.send(topic="daily", title=f"⏰{current_state}", message=message)
     except Exception:
         log.error("touching fish error!!!", exc_info=True)
-        await ntfy.send(
+        await notification.ntfy.send(
             topic="error",
             message=f"打卡异常\n{traceback.format_exc()}",
             priority=NtfyPriority.MAX_PRIORITY,
@@ -49,7 +52,7 @@ async def lazy() -> None:
 
 
 async def lazy_in_workday() -> None:
-    if not utils.is_workday(config.WORKDAY_BASE_URL):
+    if not await utils.is_workday(config.WORKDAY_BASE_URL):
         log.info("holiday holiday holiday!!!")
         return
     await lazy()
@@ -57,13 +60,13 @@ async def lazy_in_workday() -> None:
 
 async def lazy_with_random_delay(min_sec: int = 1, max_sec: int = 300) -> None:
     delay_sec = random.randint(min_sec, max_sec)
-    log.info(f"touching fish start in {delay_sec} seconds")
+    log.info("touching fish start in %d seconds", delay_sec)
     await asyncio.sleep(delay_sec)
     await lazy()
 
 
 async def lazy_with_random_delay_in_workday(min_sec: int = 1, max_sec: int = 300) -> None:
-    if not utils.is_workday(config.WORKDAY_BASE_URL):
+    if not await utils.is_workday(config.WORKDAY_BASE_URL):
         log.info("holiday holiday holiday!!!")
         return
     await lazy_with_random_delay(min_sec, max_sec)
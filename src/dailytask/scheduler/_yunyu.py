@@ -1,13 +1,14 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+import asyncio
 import traceback
 from datetime import datetime
 from typing import Any
 
-from ..api import yunyu
+from .. import api, notification
 from ..common import config, utils
-from ..notification import NtfyPriority, ntfy
+from ..notification import NtfyPriority
 
 log = utils.get_logger(
     name="scheduler-yunyu",
@@ -19,20 +20,22 @@ log = utils.get_logger(
 async def fetch_daily_bills() -> None:
     log.info("fetch daily bills start...")
     try:
-        data = await yunyu.fetch_prepay_energy_bills()
-        balance = await yunyu.fetch_prepay_balance()
+        # the bills and the balance are independent, fetch them concurrently
+        data, balance = await asyncio.gather(api.yunyu.fetch_prepay_energy_bills(), api.yunyu.fetch_prepay_balance())
         data: dict[str, Any] = data["content"][0]
+        # the consume date is a timestamp in milliseconds
+        consume_date = datetime.fromtimestamp(int(data["consumeDate"]) // 1000)
         message = (
-            f"结算时间: {datetime.fromtimestamp(int(data['consumeDate']) / 1000).strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f"结算时间: {consume_date.isoformat(sep=' ', timespec='seconds')}\n"
             f"用电量: {data['avgUsing']}度\n"
             f"单价: {data['unitPrice']} × {data['rate']}\n"
             f"小计: {data['fee']}\n"
             f"余额: {balance}"
         )
-        await ntfy.send(topic="daily", title="电费账单", message=message)
+        await notification.ntfy.send(topic="daily", title="电费账单", message=message)
     except Exception:
         log.error("fetch daily bills error!!!", exc_info=True)
-        await ntfy.send(
+        await notification.ntfy.send(
             topic="error",
             message=f"获取电费账单异常\n{traceback.format_exc()}",
             priority=NtfyPriority.MAX_PRIORITY,